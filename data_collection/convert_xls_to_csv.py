@@ -1,19 +1,27 @@
 import os
 import re
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 import pandas as pd
 
 INPUT_XL = "data_collection/registrant_counts/2012.xls"
 OUTPUT_CSV = "data_collection/registrant_counts/2012.csv"
+COLUMNS = ["Precinct No.", "Precinct Name", "Active", "Inactive"]
 
 # Match the header cell for the precinct number column
 PRECINCT_NO_HEADER = re.compile(r"\bprecinct\s*(?:no\.?|number|#)\b", re.I)
+_WS_RE = re.compile(r"\s+")
+_NONDIGIT_RE = re.compile(r"[^\d\-]")
+_CELL_SEP = "\0"
 
 
-def _norm_cell(x) -> str:
-    if pd.isna(x):
-        return ""
-    s = str(x).strip()
-    return re.sub(r"\s+", " ", s)
+def _norm_series(s: pd.Series) -> pd.Series:
+    return (
+        s.astype("string")
+        .str.strip()
+        .str.replace(_WS_RE, " ", regex=True)
+        .fillna("")
+    )
 
 
 def _find_precinct_no_header(df_nohdr: pd.DataFrame, max_scan_rows: int = 60):
@@ -21,110 +29,166 @@ def _find_precinct_no_header(df_nohdr: pd.DataFrame, max_scan_rows: int = 60):
     Find (header_row_index, precinct_no_col_index) by scanning top rows for a header
     that matches PRECINCT_NO_HEADER. Returns (row_idx, col_idx).
     """
-    norm = df_nohdr.map(_norm_cell)
-    scan = min(max_scan_rows, len(norm))
-    for r in range(scan):
-        for c in range(norm.shape[1]):
-            if PRECINCT_NO_HEADER.search(norm.iat[r, c]):
-                return r, c
+    # PRECINCT_NO_HEADER already allows any spacing, so cells are searched as-is
+    cells = df_nohdr.iloc[:max_scan_rows].fillna("").astype(str).to_numpy(dtype=object)
+    # Search the whole block as one buffer, cells joined row-major. The separator
+    # is neither a word nor a space character, so a match can't span two cells.
+    buf = _CELL_SEP.join(cells.ravel())
+    m = PRECINCT_NO_HEADER.search(buf)
+    if m:
+        r, c = divmod(buf.count(_CELL_SEP, 0, m.start()), cells.shape[1])
+        return r, c
     raise ValueError("Could not find a 'Precinct No' header within the first rows.")
 
 
 def _clean_int_series(s: pd.Series) -> pd.Series:
-    return (
-        s.astype(str)
-        .str.replace(r"[^\d\-]", "", regex=True)  # remove commas, spaces, etc.
-        .replace({"": pd.NA, "-": pd.NA})
-        .astype("Int64")
+    # Numeric cells come through as numbers already; only scrub the text ones
+    nums = pd.to_numeric(s, errors="coerce")
+    text = nums.isna() & s.notna()
+    if text.any():
+        # remove commas, spaces, etc.; blanks and lone "-" coerce to NA
+        digits = s[text].astype("string").str.replace(_NONDIGIT_RE, "", regex=True)
+        nums = nums.astype("Float64")
+        nums[text] = pd.to_numeric(digits, errors="coerce")
+    # A non-integral count (e.g. 12.5) becomes NA instead of failing the whole sheet
+    whole = (nums % 1 == 0).fillna(False).astype(bool)
+    return nums.where(whole).astype("Int64")
+
+
+def read_sheet(xls: pd.ExcelFile, sheet, max_scan_rows: int = 60) -> pd.DataFrame:
+    """
+    Read only the top rows of a sheet to locate the Precinct No column header, then
+    re-read just the data rows and the columns at deltas +0 (No.), +1 (Name),
+    +5 (Active), +6 (Inactive). Returns columns pno, name, active, inactive.
+    """
+    df_top = pd.read_excel(
+        xls, sheet_name=sheet, header=None, nrows=max_scan_rows, dtype=str
+    )
+    hdr_row, col_pno = _find_precinct_no_header(df_top, max_scan_rows)
+
+    cols = {
+        col_pno: "pno",
+        col_pno + 1: "name",
+        col_pno + 5: "active",
+        col_pno + 6: "inactive",
+    }
+    # Only ask for columns that exist (in case a sheet is short). Width is judged
+    # from the scanned top rows, so a column that only appears further down the
+    # sheet is not read; the header row sits in those rows and spans the table.
+    usecols = [c for c in cols if c < df_top.shape[1]]
+    # Text for the precinct columns; counts keep the engine's native numbers
+    dtype = {c: str for c in (col_pno, col_pno + 1) if c in usecols}
+
+    data = pd.read_excel(
+        xls,
+        sheet_name=sheet,
+        header=None,
+        skiprows=hdr_row + 1,
+        usecols=usecols,
+        dtype=dtype,
     )
+    # rename/reindex rather than assigning columns, so a sheet with a header but
+    # no data rows (read back with 0 columns) still yields the four columns
+    return data.rename(columns=cols).reindex(columns=list(cols.values()))
 
 
-def extract_sheet(df_raw: pd.DataFrame) -> pd.DataFrame:
+def extract_sheet(data: pd.DataFrame) -> pd.DataFrame:
     """
-    Given a sheet (read with header=None), locate the Precinct No column header,
-    then use column deltas +1 (Name), +2 (Active), +3 (Inactive).
+    Given the data rows of a sheet (as returned by read_sheet), normalize the
+    precinct columns and clean the registrant counts.
     """
-    hdr_row, col_pno = _find_precinct_no_header(df_raw)
-
-    # Data starts after header row
-    data = df_raw.iloc[hdr_row + 1 :].copy()
+    precinct_no = _norm_series(data["pno"])
+    precinct_name = data["name"].astype("string").str.strip()
 
-    # Column indices by delta
-    col_name = col_pno + 1
-    col_active = col_pno + 5
-    col_inactive = col_pno + 6
-
-    # Safely select columns (in case a sheet is short)
-    def safe_col(idx):
-        return (
-            data.iloc[:, idx] if idx < data.shape[1] else pd.Series([pd.NA] * len(data))
-        )
-
-    precinct_no = safe_col(col_pno).map(_norm_cell)
-    precinct_name = safe_col(col_name).map(
-        lambda x: str(x).strip() if not pd.isna(x) else x
-    )
-    active = safe_col(col_active)
-    inactive = safe_col(col_inactive)
+    # Keep rows with at least a precinct_no or name. This one mask also covers the
+    # "totally empty" rows, which need a blank precinct_no and a missing name.
+    keep = (precinct_no.to_numpy() != "") | ~pd.isna(precinct_name.to_numpy())
+    # Select the kept rows of both count columns at once, then clean them together
+    counts = data.loc[keep, ["active", "inactive"]].apply(_clean_int_series)
 
     out = pd.DataFrame(
         {
-            "Precinct No.": precinct_no,
-            "Precinct Name": precinct_name,
-            "Active": active,
-            "Inactive": inactive,
+            "Precinct No.": precinct_no[keep],
+            "Precinct Name": precinct_name[keep],
+            "Active": counts["active"],
+            "Inactive": counts["inactive"],
         }
     )
-
-    # Keep rows with at least a precinct_no or name and some numeric content
-    mask_keep = (out["Precinct No."].astype(str).str.len() > 0) | (
-        out["Precinct Name"].notna()
+    # Arrow-backed strings pack the text columns into one buffer instead of a
+    # Python object per cell
+    out = out.astype(
+        {"Precinct No.": "string[pyarrow]", "Precinct Name": "string[pyarrow]"}
     )
-    out = out[mask_keep].copy()
-
-    # Clean numerics
-    out["Active"] = _clean_int_series(out["Active"])
-    out["Inactive"] = _clean_int_series(out["Inactive"])
-
-    # Drop rows that are totally empty after cleanup
-    out = out[
-        ~(
-            out["Precinct No."].eq("")
-            & out["Precinct Name"].isna()
-            & out["Active"].isna()
-            & out["Inactive"].isna()
-        )
-    ]
 
     return out.reset_index(drop=True)
 
 
-def extract_all_sheets(xl_path: str) -> pd.DataFrame:
-    engine = "xlrd" if xl_path.lower().endswith(".xls") else None
-    xls = pd.ExcelFile(xl_path, engine=engine)
-
-    dfs = []
-    for sheet in xls.sheet_names:
-        try:
-            df_raw = pd.read_excel(xls, sheet_name=sheet, header=None, dtype=str)
-            df_part = extract_sheet(df_raw)
-            if not df_part.empty:
-                dfs.append(df_part)
-                print(f"✓ {sheet}: {len(df_part)} rows")
-            else:
-                print(f"… {sheet}: no rows")
-        except Exception as e:
-            print(f"! {sheet}: {e}")
+# Workbook handle of a pool worker process, opened once by _init_worker
+_worker_xls = None
+
 
+def _init_worker(xl_path: str):
+    global _worker_xls
+    _worker_xls = pd.ExcelFile(xl_path, engine="calamine")
+
+
+def _process_one_sheet(sheet) -> pd.DataFrame:
+    # Runs in a worker process, on that worker's own handle on the workbook
+    return extract_sheet(read_sheet(_worker_xls, sheet))
+
+
+def _collect(sheet, future):
+    try:
+        df_part = future.result()
+        if not df_part.empty:
+            print(f"✓ {sheet}: {len(df_part)} rows")
+            yield df_part
+        else:
+            print(f"… {sheet}: no rows")
+    except Exception as e:
+        print(f"! {sheet}: {e}")
+
+
+def iter_sheets(xl_path: str):
+    """
+    Yield the non-empty extracted frame of each sheet, in workbook order.
+    """
+    # calamine reads both .xls and .xlsx natively, much faster than xlrd/openpyxl
+    with pd.ExcelFile(xl_path, engine="calamine") as xls:
+        sheet_names = xls.sheet_names
+
+    # Sheets are independent, so extract them in parallel and collect in order.
+    # Only about one task per worker is kept in flight, and each future is dropped
+    # once consumed, so finished sheets don't pile up in memory.
+    max_workers = os.cpu_count() or 1
+    pending = deque()
+    with ProcessPoolExecutor(
+        max_workers=max_workers, initializer=_init_worker, initargs=(xl_path,)
+    ) as pool:
+        for sheet in sheet_names:
+            pending.append((sheet, pool.submit(_process_one_sheet, sheet)))
+            if len(pending) >= max_workers:
+                yield from _collect(*pending.popleft())
+        while pending:
+            yield from _collect(*pending.popleft())
+
+
+def extract_all_sheets(xl_path: str) -> pd.DataFrame:
+    dfs = list(iter_sheets(xl_path))
     if dfs:
         return pd.concat(dfs, ignore_index=True)
-    return pd.DataFrame(columns=["Precinct No.", "Precinct Name", "Active", "Inactive"])
+    return pd.DataFrame(columns=COLUMNS)
 
 
 if __name__ == "__main__":
-    df = extract_all_sheets(INPUT_XL)
-    print(df.head(10))
-
     os.makedirs(os.path.dirname(OUTPUT_CSV) or ".", exist_ok=True)
-    df.to_csv(OUTPUT_CSV, index=False)
-    print(f"Wrote {OUTPUT_CSV}")
+
+    # Write each sheet as it arrives instead of holding the whole workbook in memory
+    rows = 0
+    with open(OUTPUT_CSV, "w", newline="") as f:
+        for i, df_part in enumerate(iter_sheets(INPUT_XL)):
+            df_part.to_csv(f, index=False, header=(i == 0))
+            rows += len(df_part)
+        if rows == 0:
+            pd.DataFrame(columns=COLUMNS).to_csv(f, index=False)
+    print(f"Wrote {rows} rows to {OUTPUT_CSV}")
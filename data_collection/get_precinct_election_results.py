@@ -1,8 +1,11 @@
+import asyncio
 import os
 import re
 import time
 from urllib.parse import urljoin
-import requests
+import aiofiles
+import httpx
+from selectolax.lexbor import LexborHTMLParser
 
 BASE = "https://historical.elections.virginia.gov"
 START_ELECTION_ID = 167946  # your starting page
@@ -12,16 +15,47 @@ NEEDED = 4  # VA only has registration data by locality back to 2012 so we only
 DL_TPL = "/elections/download/{eid}/precincts_include:1/"
 JUMP_TPL = "/elections/jump_list/{eid}/"
 
+# Server-suggested filename in a Content-Disposition header
+_FILENAME_RE = re.compile(r'filename="?(?P<fn>[^";]+)"?')
+
 HEADERS = {
-    "User-Agent": "Mozilla/5.0 (+https://github.com/psf/requests) VA precinct fetcher"
+    "User-Agent": "Mozilla/5.0 (+https://www.python-httpx.org) VA precinct fetcher"
 }
 
 
-def get(session: requests.Session, url: str, **kwargs) -> requests.Response:
+def make_client() -> httpx.Client:
+    """
+    One pooled HTTP/2 client for the whole run so connections stay open between requests.
+    The transport retries failed connects; 5xx responses are retried in get().
+    """
+    transport = httpx.HTTPTransport(
+        http2=True,
+        limits=httpx.Limits(max_keepalive_connections=8),
+        retries=3,
+    )
+    return httpx.Client(
+        headers=HEADERS, timeout=30, follow_redirects=True, transport=transport
+    )
+
+
+def make_async_client() -> httpx.AsyncClient:
+    """Async counterpart of make_client() for the concurrent downloads."""
+    transport = httpx.AsyncHTTPTransport(
+        http2=True,
+        limits=httpx.Limits(max_keepalive_connections=8),
+        retries=3,
+    )
+    return httpx.AsyncClient(
+        headers=HEADERS, timeout=30, follow_redirects=True, transport=transport
+    )
+
+
+def get(session: httpx.Client, url: str) -> httpx.Response:
     for attempt in range(5):
-        r = session.get(url, headers=HEADERS, timeout=30, **kwargs)
+        r = session.get(url)
         # retry only for 5xx
         if r.status_code >= 500:
+            r.close()
             time.sleep(1.2 * (attempt + 1))
             continue
         r.raise_for_status()
@@ -30,25 +64,25 @@ def get(session: requests.Session, url: str, **kwargs) -> requests.Response:
     return r  # never reached
 
 
-def parse_jump_list(session: requests.Session, current_id: int):
+def parse_jump_list(session: httpx.Client, current_id: int):
     """
     Returns (ordered_ids, ordered_labels, selected_id) from the Similar results <select>.
     """
     jump_url = urljoin(BASE, JUMP_TPL.format(eid=current_id))
     r = get(session, jump_url)
-    html = r.text
+    doc = LexborHTMLParser(r.text)
 
     # Pull all <option value="...">Label</option> in order
-    option_pattern = re.compile(
-        r'<option[^>]*value="(\d+)"([^>]*)>(.*?)</option>', flags=re.I | re.S
-    )
     ids, labels, selected_id = [], [], None
-    for val, attrs, label in option_pattern.findall(html):
+    for opt in doc.css("option[value]"):
+        val = (opt.attributes.get("value") or "").strip()
+        if not val.isdigit():
+            continue
         eid = int(val)
-        text = re.sub(r"\s+", " ", label).strip()
+        text = " ".join(opt.text().split())
         ids.append(eid)
         labels.append(text)
-        if re.search(r"\bselected\b", attrs, flags=re.I):
+        if "selected" in opt.attributes:
             selected_id = eid
 
     if not ids:
@@ -60,20 +94,35 @@ def parse_jump_list(session: requests.Session, current_id: int):
     return ids, labels, selected_id
 
 
-def next_after_selected(ids, selected_id):
-    """Return the next id after selected_id (no wrap)."""
-    try:
-        idx = ids.index(selected_id)
-    except ValueError:
-        idx = -1
-    nxt = idx + 1
-    if nxt >= len(ids):
-        raise StopIteration("Reached the end of the Similar results list.")
-    return ids[nxt]
+async def aget(client: httpx.AsyncClient, url: str) -> httpx.Response:
+    """Async twin of get(); always streams the body."""
+    for attempt in range(5):
+        r = await client.send(client.build_request("GET", url), stream=True)
+        # retry only for 5xx
+        if r.status_code >= 500:
+            await r.aclose()
+            await asyncio.sleep(1.2 * (attempt + 1))
+            continue
+        try:
+            r.raise_for_status()
+        except httpx.HTTPStatusError:
+            # the caller never sees this response, so release the stream here
+            await r.aclose()
+            raise
+        return r
+    r.raise_for_status()
+    return r  # never reached
 
 
-def download_precinct_csv(
-    session: requests.Session, election_id: int, label: str, outdir: str
+def csv_basename(label: str) -> str:
+    """Build a clean filename for an election label."""
+    # Example label: "President/General/2024" → "President_General_2024"
+    normalized_label = label.replace("/", "_").replace(" ", "_")
+    return f"VA_{normalized_label}_precincts.csv"
+
+
+async def download_precinct_csv(
+    client: httpx.AsyncClient, election_id: int, label: str, outdir: str
 ) -> str:
     """
     Downloads the precinct CSV and saves it. Filename is normalized to include President_General if present in the label.
@@ -81,93 +130,84 @@ def download_precinct_csv(
     """
     os.makedirs(outdir, exist_ok=True)
     dl_url = urljoin(BASE, DL_TPL.format(eid=election_id))
-    r = get(session, dl_url, stream=True)
+    r = await aget(client, dl_url)
+    try:
+        # Heuristic: ensure we're not saving HTML as CSV (e.g., if auth/redirect)
+        ctype = r.headers.get("Content-Type", "")
+        if "text/html" in ctype.lower():
+            raise RuntimeError(f"Download for {election_id} returned HTML, not CSV.")
+
+        base_name = csv_basename(label)
+
+        # If server provides a filename, we’ll prefer its extension but keep our prefix
+        cd = r.headers.get("Content-Disposition", "")
+        ext = ".csv"
+        m = _FILENAME_RE.search(cd)
+        if m:
+            _, srv_ext = os.path.splitext(m.group("fn"))
+            if srv_ext:
+                ext = srv_ext
+        fname = os.path.splitext(base_name)[0] + ext
+
+        path = os.path.join(outdir, fname)
+        async with aiofiles.open(path, "wb") as f:
+            async for chunk in r.aiter_bytes(chunk_size=1 << 20):
+                if chunk:
+                    await f.write(chunk)
+    finally:
+        await r.aclose()
+    return path
 
-    # Heuristic: ensure we're not saving HTML as CSV (e.g., if auth/redirect)
-    ctype = r.headers.get("Content-Type", "")
-    if "text/html" in ctype.lower():
-        raise RuntimeError(f"Download for {election_id} returned HTML, not CSV.")
 
-    # Build a clean filename
-    # Example label: "President/General/2024" → "President_General_2024"
-    normalized_label = label.replace("/", "_").replace(" ", "_")
-    base_name = f"VA_{normalized_label}_precincts.csv"
-
-    # If server provides a filename, we’ll prefer its extension but keep our prefix
-    cd = r.headers.get("Content-Disposition", "")
-    ext = ".csv"
-    m = re.search(r'filename="?(?P<fn>[^";]+)"?', cd)
-    if m:
-        _, srv_ext = os.path.splitext(m.group("fn"))
-        if srv_ext:
-            ext = srv_ext
-    fname = os.path.splitext(base_name)[0] + ext
-
-    path = os.path.join(outdir, fname)
-    with open(path, "wb") as f:
-        for chunk in r.iter_content(chunk_size=1 << 15):
-            if chunk:
-                f.write(chunk)
-    return path
+async def download_all(candidates):
+    """
+    Download (election_id, label) candidates concurrently, in order, until NEEDED succeed.
+    Returns [(election_id, label, path), ...] for the kept datasets.
+    """
+    saved = []
 
+    async with make_async_client() as client:
 
-def main():
-    session = requests.Session()
+        async def download_one(election_id, label):
+            print(f"Considering {election_id}: {label}")
+            try:
+                path = await download_precinct_csv(client, election_id, label, OUTDIR)
+            except Exception as e:
+                print(f"  ✗ Skip {election_id} (download issue): {e}")
+                return None
+            print(f"  ✓ KEPT {election_id} ({label}): {path}")
+            return election_id, label, path
 
-    # Prime the jump list to know the ordered elections and where we are
-    ids, labels, selected = parse_jump_list(session, START_ELECTION_ID)
+        # be polite to the server: each batch only starts as many downloads as we
+        # still need, so at most NEEDED are ever in flight; top up if some fail
+        pos = 0
+        while len(saved) < NEEDED and pos < len(candidates):
+            batch = candidates[pos : pos + NEEDED - len(saved)]
+            pos += len(batch)
+            results = await asyncio.gather(*(download_one(*c) for c in batch))
+            saved.extend(res for res in results if res is not None)
 
-    kept = 0
-    saved = []
+    return saved
 
-    current = selected
-    # We'll keep stepping "next" until we accumulate NEEDED kept datasets
-    while kept < NEEDED:
-        # Find the next election (no wrap). For the very first iteration, we want the current (selected)
-        # as our first candidate before moving next—because your starting link is a valid item.
-        candidate_id = current
-        try:
-            # Determine the label corresponding to this candidate
-            try:
-                idx = ids.index(candidate_id)
-                label = labels[idx]
-            except ValueError:
-                # If somehow not present, refresh jump list from this page
-                ids, labels, selected = parse_jump_list(session, candidate_id)
-                idx = ids.index(selected)
-                label = labels[idx]
-
-            print(f"Considering {candidate_id}: {label}")
-
-            # Keep ONLY if label includes 'President/General'
-            if "President/General" in label:
-                try:
-                    path = download_precinct_csv(session, candidate_id, label, OUTDIR)
-                    kept += 1
-                    saved.append((candidate_id, label, path))
-                    print(f"  ✓ KEPT [{kept}/{NEEDED}]: {path}")
-                except Exception as e:
-                    print(f"  ✗ Skip {candidate_id} (download issue): {e}")
-            else:
-                print(f"  ✗ Skip {candidate_id} (label not President/General)")
-
-            # Move to the next item in the **same** list (no wrap)
-            current = next_after_selected(ids, candidate_id)
-
-        except StopIteration:
-            print("No more similar results to traverse.")
-            break
-        except Exception as e:
-            print(f"Error while processing {candidate_id}: {e}")
-            # Try to advance anyway; if that also fails we'll bail
-            try:
-                current = next_after_selected(ids, candidate_id)
-            except StopIteration:
-                print("No more similar results to traverse.")
-                break
 
-        # be polite to the server
-        time.sleep(0.6)
+def main():
+    # Prime the jump list to know the ordered elections and where we are
+    with make_client() as session:
+        ids, labels, selected = parse_jump_list(session, START_ELECTION_ID)
+
+    # Walk the **same** list forward from the selected election (no wrap). The starting
+    # link is a valid item, so it is the first candidate.
+    start = ids.index(selected)
+    by_file = {}
+    for eid, label in zip(ids[start:], labels[start:]):
+        # Keep ONLY if label includes 'President/General'. Keep the first election
+        # per output file; two concurrent downloads to one path would interleave.
+        if "President/General" in label:
+            by_file.setdefault(csv_basename(label), (eid, label))
+    candidates = list(by_file.values())
+
+    saved = asyncio.run(download_all(candidates))
+    kept = len(saved)
 
     print("\nFinished.")
     for eid, label, p in saved: